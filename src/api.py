@@ -1,31 +1,36 @@
 from __future__ import annotations
 
+import os
 import sys
-import json
-import shutil
-import tempfile
+import base64
+import asyncio
+import threading
 from typing import Annotated
 from pathlib import Path
 from datetime import datetime
 from datetime import timezone
 
+import cv2
+import numpy as np
+import orjson
 from loguru import logger
 from fastapi import File
 from fastapi import Form
 from fastapi import FastAPI
 from fastapi import UploadFile
 from fastapi import HTTPException
-from ultralytics import YOLO
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 
 from .utils import predict_image
+from .utils import get_runtime_model
+from .utils import prediction_cache_key
 from .utils import display_surgical_detections
 
 # Configure logger
 logger.add(sys.stderr, format="{time} {level} {message}", level="INFO")
 
 # Initialize FastAPI app
-app = FastAPI(title="Surgical Tools Detection API")
+app = FastAPI(title="Surgical Tools Detection API", default_response_class=ORJSONResponse)
 
 # Setup storage directories
 STORAGE_DIR = Path(__file__).parent.parent / "storage"
@@ -39,28 +44,207 @@ UPLOADS_DIR.mkdir(exist_ok=True)
 PREDICTIONS_DIR.mkdir(exist_ok=True)
 SESSIONS_DIR.mkdir(exist_ok=True)
 
+# Serializes read-modify-write updates of the sessions file across worker threads
+SESSIONS_LOCK = threading.Lock()
+
+# Size of the chunks used to read uploads (1 MiB)
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+# Magic bytes of the accepted image formats and the extension used to store them
+IMAGE_SIGNATURES = {
+    b"\xff\xd8\xff": ".jpg",
+    b"\x89PNG\r\n\x1a\n": ".png",
+}
+
 # Load reference data and instrument mapping from config.json
 CONFIG_PATH = Path(__file__).parent.parent / "config.json"
 try:
-    with CONFIG_PATH.open() as f:
-        config = json.load(f)
-        REFERENCE_DATA = config["REFERENCE_DATA"]
-        SURGICAL_INSTRUMENTS = config["SURGICAL_INSTRUMENTS"]
-        BEST_MODEL = config["BEST_MODEL"]
+    config = orjson.loads(CONFIG_PATH.read_bytes())
+    REFERENCE_DATA = config["REFERENCE_DATA"]
+    SURGICAL_INSTRUMENTS = config["SURGICAL_INSTRUMENTS"]
+    BEST_MODEL = config["BEST_MODEL"]
 except FileNotFoundError:
     raise RuntimeError(f"Config file not found at {CONFIG_PATH}")
-except json.JSONDecodeError:
+except orjson.JSONDecodeError:
     raise RuntimeError("Invalid JSON format in config.json")
 except KeyError as e:
     raise RuntimeError(f"Missing required key in config.json: {e}")
 
-# Load YOLO model
+def build_reference_index(reference_data: dict) -> dict:
+    """
+    Precompute the expected instruments, counts and weight for every set type.
+
+    Args:
+        reference_data: REFERENCE_DATA section of config.json
+
+    Returns:
+        Dictionary mapping each set type to its expected instruments, counts by type and weight
+
+    """
+    index = {}
+    for set_type, items in reference_data.items():
+        expected = [item for item in items if "type" in item]
+        weight_item = next((item for item in items if "weight" in item), None)
+        index[set_type] = {
+            "expected": expected,
+            "by_type": {item["type"]: item["expected_count"] for item in expected},
+            "weight": float(weight_item["weight"].replace(" kg", "")) if weight_item else None,
+        }
+    return index
+
+try:
+    REF_INDEX = build_reference_index(REFERENCE_DATA)
+except (KeyError, ValueError) as e:
+    raise RuntimeError(f"Invalid reference data in config.json: {e}")
+
+# Micro-batching of concurrent requests into a single forward pass
+INFER_MAX_BATCH = int(os.getenv("INFER_MAX_BATCH", "8"))
+
+# Load YOLO model, preferring a TensorRT engine that accepts the largest batch; EXPORT_TENSORRT=1 builds one
 MODEL_PATH = Path(f"runs/detect/{BEST_MODEL['folder_name']}/weights/best.pt")
-model = YOLO(MODEL_PATH)
+model = get_runtime_model(
+    MODEL_PATH,
+    batch=INFER_MAX_BATCH,
+    export=os.getenv("EXPORT_TENSORRT", "0") == "1",
+)
+
+# Bound the number of batches handed to worker threads; Ultralytics runs them one at a time on the shared model
+INFER_CONCURRENCY = int(os.getenv("INFER_CONCURRENCY", "1"))
+INFER_SEM = asyncio.Semaphore(INFER_CONCURRENCY)
+
+INFER_BATCH_WINDOW = float(os.getenv("INFER_BATCH_WINDOW_MS", "15")) / 1000
+# Uploads wait in the handler once every batch slot is full, so decoded images cannot pile up without bound
+INFER_QUEUE: asyncio.Queue[tuple[np.ndarray, tuple | None, asyncio.Future]] = asyncio.Queue(
+    maxsize=INFER_MAX_BATCH * INFER_CONCURRENCY,
+)
+_background_tasks: set[asyncio.Task] = set()
+
+# Number of dummy forward passes used to warm up the model at startup
+WARMUP_RUNS = 2
+WARMUP_IMGSZ = 640
+
+def warmup_model() -> None:
+    """Run dummy predictions so the first real request does not pay the model cold-start cost."""
+    dummy_image = np.zeros((WARMUP_IMGSZ, WARMUP_IMGSZ, 3), dtype=np.uint8)
+    for _ in range(WARMUP_RUNS):
+        model.predict(dummy_image, imgsz=WARMUP_IMGSZ, conf=0.1, verbose=False)
+
+@app.on_event("startup")
+async def _warmup() -> None:
+    """Warm up the YOLO model in a worker thread without blocking the event loop."""
+    logger.info("Warming up YOLO model")
+    await asyncio.get_running_loop().run_in_executor(None, warmup_model)
+    logger.info("YOLO model warm-up complete")
+
+async def run_inference_batch(batch: list[tuple[np.ndarray, tuple | None, asyncio.Future]]) -> None:
+    """
+    Run a single forward pass over a batch of images and resolve the waiting requests.
+
+    Args:
+        batch: Decoded images with their cache keys and the futures of the requests awaiting them
+
+    """
+    try:
+        results = await asyncio.to_thread(
+            predict_image,
+            model=model,
+            image_paths=[img for img, _, _ in batch],
+            conf_threshold=0.1,
+            save=False,
+            show=False,
+            batch=len(batch),
+            use_cache=True,
+            cache_keys=[key for _, key, _ in batch],
+        )
+    except Exception as e:
+        for _, _, future in batch:
+            if not future.done():
+                future.set_exception(e)
+        return
+
+    for (_, _, future), result in zip(batch, results, strict=True):
+        if not future.done():
+            future.set_result([result])
+
+async def batch_inference_worker() -> None:
+    """Collect queued images for up to INFER_BATCH_WINDOW and run them as one batch."""
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await INFER_QUEUE.get()]
+        deadline = loop.time() + INFER_BATCH_WINDOW
+        while len(batch) < INFER_MAX_BATCH:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(INFER_QUEUE.get(), timeout))
+            except TimeoutError:
+                break
+
+        await INFER_SEM.acquire()
+        task = asyncio.create_task(run_inference_batch(batch))
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+        task.add_done_callback(lambda _: INFER_SEM.release())
+
+@app.on_event("startup")
+async def _start_batch_worker() -> None:
+    """Start the background task that batches inference requests."""
+    task = asyncio.create_task(batch_inference_worker())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+@app.on_event("shutdown")
+async def _stop_background_tasks() -> None:
+    """Cancel the batching worker and any in-flight batches."""
+    for task in list(_background_tasks):
+        task.cancel()
+
+def detect_image_suffix(header: bytes | bytearray) -> str | None:
+    """
+    Detect the image format from its leading magic bytes.
+
+    Args:
+        header: First bytes of the uploaded file
+
+    Returns:
+        File extension of the detected format, None if the format is not supported
+
+    """
+    for signature, suffix in IMAGE_SIGNATURES.items():
+        if header.startswith(signature):
+            return suffix
+    # WebP is a RIFF container, with its form type after the 4-byte chunk size
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return ".webp"
+    return None
+
+def save_predicted_image(results: list, pred_path: Path) -> bytes:
+    """
+    Render the annotated prediction in memory and write it to its final location.
+
+    Args:
+        results: YOLO detection results for a single image
+        pred_path: Destination path of the annotated image
+
+    Returns:
+        JPEG-encoded bytes of the annotated image
+
+    """
+    annotated = results[0].plot()
+    success, encoded = cv2.imencode(".jpg", annotated)
+    if not success:
+        raise OSError(f"Failed to encode predicted image for {pred_path}")
+
+    image_bytes = encoded.tobytes()
+    pred_path.write_bytes(image_bytes)
+    return image_bytes
 
 def save_session_data(
-    original_image: Path,
+    original_image: bytes | bytearray,
+    original_suffix: str,
     predicted_image: Path,
+    timestamp: str,
     set_type: str,
     operation_type: str,
     weight_input: float,
@@ -70,8 +254,10 @@ def save_session_data(
     Save session data including images and detection results.
 
     Args:
-        original_image: Path to the original uploaded image
-        predicted_image: Path to the predicted image
+        original_image: Raw bytes of the original uploaded image
+        original_suffix: File extension of the original uploaded image
+        predicted_image: Path to the already saved predicted image
+        timestamp: Timestamp identifying the session
         set_type: Type of surgical set
         operation_type: Type of operation
         weight_input: Weight measurement from input
@@ -81,18 +267,10 @@ def save_session_data(
         Dictionary with saved file paths and session info
 
     """
-    # Generate timestamp for the session
-    timestamp = datetime.now(tz=timezone.utc).strftime("%Y%m%d_%H%M%S")
-
     # Save original image
-    orig_name = f"{timestamp}_original{original_image.suffix}"
+    orig_name = f"{timestamp}_original{original_suffix}"
     orig_path = UPLOADS_DIR / orig_name
-    shutil.copy2(original_image, orig_path)
-
-    # Save predicted image
-    pred_name = f"{timestamp}_predicted{predicted_image.suffix}"
-    pred_path = PREDICTIONS_DIR / pred_name
-    shutil.copy2(predicted_image, pred_path)
+    orig_path.write_bytes(original_image)
 
     # Prepare session data
     session_data = {
@@ -101,50 +279,47 @@ def save_session_data(
         "operation_type": operation_type,
         "weight_input": weight_input,
         "original_image": str(orig_path),
-        "predicted_image": str(pred_path),
+        "predicted_image": str(predicted_image),
         "detection_results": detection_result,
     }
 
     # Path to the single sessions JSON file
     sessions_file = SESSIONS_DIR / "sessions.json"
 
-    # Load existing sessions or create new file
-    if sessions_file.exists():
-        try:
-            with open(sessions_file) as f:
-                sessions = json.load(f)
-        except json.JSONDecodeError:
-            # If file is corrupted, start fresh
+    with SESSIONS_LOCK:
+        # Load existing sessions or create new file
+        if sessions_file.exists():
+            try:
+                sessions = orjson.loads(sessions_file.read_bytes())
+            except orjson.JSONDecodeError:
+                # If file is corrupted, start fresh
+                sessions = {"sessions": []}
+        else:
             sessions = {"sessions": []}
-    else:
-        sessions = {"sessions": []}
 
-    # Append new session data
-    sessions["sessions"].append(session_data)
+        # Append new session data
+        sessions["sessions"].append(session_data)
 
-    # Save updated sessions data
-    with open(sessions_file, "w") as f:
-        json.dump(sessions, f, indent=4)
+        # Save updated sessions data
+        sessions_file.write_bytes(orjson.dumps(sessions))
 
     return session_data
 
-def check_weight_mismatch(ref_data: list, weight_input: float) -> dict | None:
+def check_weight_mismatch(expected_weight: float | None, weight_input: float) -> dict | None:
     """
     Check if the input weight matches the expected weight from reference data.
 
     Args:
-        ref_data: List of expected items including weight
+        expected_weight: Expected weight of the set in kg, None if the set has no weight
         weight_input: The measured weight from input
 
     Returns:
         Dict with mismatch details if weight doesn't match, None otherwise
 
     """
-    weight_item = next((item for item in ref_data if "weight" in item), None)
-    if not weight_item:
+    if expected_weight is None:
         return None
 
-    expected_weight = float(weight_item["weight"].replace(" kg", ""))
     if weight_input != expected_weight:
         return {
             "type": "Weight",
@@ -152,7 +327,7 @@ def check_weight_mismatch(ref_data: list, weight_input: float) -> dict | None:
             "found": weight_input,
         }
 
-    logger.info(f"Weight matches expected: {weight_input} kg")
+    logger.info("Weight matches expected: {} kg", weight_input)
     return None
 
 @app.post("/infer")
@@ -161,7 +336,7 @@ async def infer(
     weight_input: Annotated[float, Form()],
     operation_type: Annotated[str, Form()],
     image: Annotated[UploadFile, File()],
-) -> JSONResponse:
+) -> ORJSONResponse:
     """
     Process uploaded image for surgical tool detection and validation.
 
@@ -172,7 +347,7 @@ async def infer(
         image: Uploaded image file for detection
 
     Returns:
-        JSONResponse containing detection results and validation status
+        ORJSONResponse containing detection results and validation status
 
     """
     try:
@@ -183,62 +358,47 @@ async def infer(
                 detail=f"Invalid set type. Available types: {list(REFERENCE_DATA.keys())}",
             )
 
-        # check if the image is a valid file
-        if not image.filename.lower().endswith((".png", ".jpg", ".jpeg")):
+        logger.info("Received image: {}", image.filename)
+
+        # Read the upload in bounded chunks and decode it in memory
+        contents = bytearray(await image.read(UPLOAD_CHUNK_SIZE))
+
+        # check if the image is a valid file from its magic bytes
+        image_suffix = detect_image_suffix(contents)
+        if image_suffix is None:
             raise HTTPException(
                 status_code=400,
-                detail="Invalid image format. Only PNG, JPG, and JPEG are allowed.",
+                detail="Invalid image format. Only PNG, JPG, JPEG and WebP are allowed.",
             )
 
-        logger.info(f"Received image: {image.filename}")
-
-        # Save uploaded image to a temporary file
-        with tempfile.NamedTemporaryFile(suffix=".jpg", delete=False) as temp_image:
-            contents = await image.read()
-            temp_image.write(contents)
-            temp_image_path = temp_image.name
-
-        # Run inference using utility function
-        results = predict_image(
-            model=model,
-            image_path=temp_image_path,
-            conf_threshold=0.1,
-            save=True,
-            show=False,
-        )
-
-        # Get the absolute path of the project root directory
-        project_root = Path(__file__).parent.parent.absolute()
-        detect_dir = project_root / "runs/detect"
+        while chunk := await image.read(UPLOAD_CHUNK_SIZE):
+            contents += chunk
 
-        # Find the latest prediction folder (predict, predict2, predict3, etc.)
-        pred_folders = sorted(
-            [d for d in detect_dir.glob("predict*") if d.is_dir()],
-            key=lambda x: int(x.name.replace("predict", "") or "0"),
-        )
+        img = cv2.imdecode(np.frombuffer(contents, np.uint8), cv2.IMREAD_COLOR)
+        if img is None:
+            raise HTTPException(status_code=400, detail="Could not decode the uploaded image.")
 
-        if not pred_folders:
-            raise HTTPException(status_code=500, detail="No prediction folders found")
+        # Queue the image for batched inference, keyed for the prediction cache by its upload bytes
+        cache_key = prediction_cache_key(contents, conf_threshold=0.1)
+        future = asyncio.get_running_loop().create_future()
+        await INFER_QUEUE.put((img, cache_key, future))
+        results = await future
 
-        latest_pred_folder = pred_folders[-1]
-        logger.info(f"Looking for predictions in: {latest_pred_folder}")
+        # Generate timestamp for the session
+        timestamp = datetime.now(tz=timezone.utc).strftime("%Y%m%d_%H%M%S_%f")
 
-        # Get the prediction image from the latest folder
-        pred_path = next(latest_pred_folder.glob("*.jpg"), None)
-        if not pred_path:
-            raise HTTPException(
-                status_code=500,
-                detail=f"No prediction image found in {latest_pred_folder}",
-            )
+        # Write the annotated prediction straight to the predictions directory
+        pred_path = PREDICTIONS_DIR / f"{timestamp}_predicted.jpg"
+        pred_image_bytes = await asyncio.to_thread(save_predicted_image, results, pred_path)
 
         # Use display_surgical_detections to process results and get detections
-        detection_result = display_surgical_detections(results, SURGICAL_INSTRUMENTS)
+        detection_result = await asyncio.to_thread(display_surgical_detections, results, SURGICAL_INSTRUMENTS)
 
         # First calculate missing items
-        # Get reference data and expected instruments
-        ref_data = REFERENCE_DATA[set_type]
-        expected_instruments = [item for item in ref_data if "type" in item]
-        
+        # Get precomputed reference data for the set
+        ref_entry = REF_INDEX[set_type]
+        expected_instruments = ref_entry["expected"]
+
         # Create a map of detected instruments for easy lookup
         detected_map = {
             item["type"]: item["count"]
@@ -249,13 +409,11 @@ async def infer(
         missing_items = []
 
         # Check weight mismatch
-        weight_mismatch = check_weight_mismatch(ref_data, weight_input)
+        weight_mismatch = check_weight_mismatch(ref_entry["weight"], weight_input)
         if weight_mismatch:
             missing_items.append(weight_mismatch)
 
-        for expected in expected_instruments:
-            expected_type = expected["type"]
-            expected_count = expected["expected_count"]
+        for expected_type, expected_count in ref_entry["by_type"].items():
             detected_count = detected_map.get(expected_type, 0)
 
             if detected_count < expected_count:
@@ -272,9 +430,12 @@ async def infer(
         detection_result["set_complete"] = len(missing_items) == 0
 
         # Save session data and get updated paths
-        session_data = save_session_data(
-            original_image=Path(temp_image_path),
+        session_data = await asyncio.to_thread(
+            save_session_data,
+            original_image=contents,
+            original_suffix=image_suffix,
             predicted_image=pred_path,
+            timestamp=timestamp,
             set_type=set_type,
             operation_type=operation_type,
             weight_input=weight_input,
@@ -283,10 +444,7 @@ async def infer(
 
         # Update the detection result with the new predicted image path
         detection_result["predicted_image_path"] = session_data["predicted_image"]
-        logger.info(f"Found prediction image at: {pred_path}")
-
-        # Clean up temporary file
-        Path(temp_image_path).unlink()
+        logger.info("Saved prediction image at: {}", pred_path)
 
         # Use the previously calculated data
 
@@ -296,16 +454,17 @@ async def infer(
             "set_complete": len(missing_items) == 0,
             "missing_items": missing_items,
             "predicted_image_path": detection_result["predicted_image_path"],
+            "predicted_image_b64": base64.b64encode(pred_image_bytes).decode("ascii"),
             "operation_type": operation_type,
         }
 
-        logger.info(f"Sending response with image path: {response['predicted_image_path']}")
-        return JSONResponse(content=response)
+        logger.info("Sending response with image path: {}", response["predicted_image_path"])
+        return ORJSONResponse(response)
 
     except HTTPException:
         raise
     except (OSError, ValueError) as e:
-        logger.error(f"Error processing request: {e}")
+        logger.error("Error processing request: {}", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 if __name__ == "__main__":
@@ -1,22 +1,138 @@
 from __future__ import annotations
 
+import io
 import sys
-import json
+import base64
 import tkinter as tk
 import traceback
+from typing import TYPE_CHECKING
 from pathlib import Path
 from tkinter import ttk
 from tkinter import filedialog
 from tkinter import messagebox
+from functools import lru_cache
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
 
+import orjson
 import requests
-from PIL import Image  # PIL for image processing
 from loguru import logger
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+if TYPE_CHECKING:
+    from PIL import Image
 
 # Configure logger
 logger.remove()  # Remove default handler
 logger.add(sys.stderr, format="{time} {level} {message}", level="INFO")
 
+# Load reference data once at import time
+CONFIG_PATH = Path(__file__).parent.parent / "config.json"
+try:
+    REFERENCE_DATA = orjson.loads(CONFIG_PATH.read_bytes())["REFERENCE_DATA"]
+    CONFIG_ERROR = None
+except Exception as e:
+    REFERENCE_DATA = {}
+    CONFIG_ERROR = e
+
+# Available set types shown in the set type selector
+SET_TYPES = tuple(REFERENCE_DATA)
+
+# Relative size difference below which an image is displayed without resampling
+RESIZE_TOLERANCE = 0.05
+
+
+def display_size(width: int, height: int, max_width: int, max_height: int) -> tuple[int, int]:
+    """
+    Compute the size an image is displayed at, keeping its aspect ratio within the maximum dimensions.
+
+    Args:
+        width: Width of the full-size image.
+        height: Height of the full-size image.
+        max_width: Maximum width of the displayed image.
+        max_height: Maximum height of the displayed image.
+
+    Returns:
+        The display size, or the original size if it is within RESIZE_TOLERANCE of it.
+
+    """
+    ratio = min(max_width / width, max_height / height)
+    if abs(ratio - 1.0) < RESIZE_TOLERANCE:
+        return width, height
+    return max(round(width * ratio), 1), max(round(height * ratio), 1)
+
+
+def prepare_preview_image(image_data: bytes, max_width: int, max_height: int) -> Image.Image | None:
+    """
+    Build a cheap low-resolution preview of a JPEG image at its display size.
+
+    Args:
+        image_data: Encoded image bytes.
+        max_width: Maximum width of the displayed image.
+        max_height: Maximum height of the displayed image.
+
+    Returns:
+        The preview image, or None if the file is not a JPEG and cannot be decoded at reduced scale.
+
+    """
+    from PIL import Image  # noqa: PLC0415 - imported lazily to speed up GUI startup
+
+    image = Image.open(io.BytesIO(image_data))
+    if image.format != "JPEG":
+        return None
+
+    # Compute the display size from the full dimensions before decoding at 1/8 scale
+    size = display_size(*image.size, max_width, max_height)
+    image.draft("RGB", (max_width // 8, max_height // 8))
+    return image.resize(size, Image.Resampling.BILINEAR)
+
+
+@lru_cache(maxsize=8)
+def prepare_display_image(image_data: bytes, max_width: int, max_height: int) -> Image.Image:
+    """
+    Decode an image and scale it to fit within the given dimensions.
+
+    Results are cached so displaying the same image again skips decoding and resampling.
+
+    Args:
+        image_data: Encoded image bytes.
+        max_width: Maximum width of the displayed image.
+        max_height: Maximum height of the displayed image.
+
+    Returns:
+        The scaled image ready to be displayed.
+
+    """
+    from PIL import Image  # noqa: PLC0415 - imported lazily to speed up GUI startup
+
+    # Open and process image
+    image = Image.open(io.BytesIO(image_data))
+    logger.info(f"Original image size: {image.size}")
+
+    # Compute the display size from the full dimensions, as the preview does, before decoding at reduced scale
+    size = display_size(*image.size, max_width, max_height)
+
+    # Let the JPEG decoder downscale while decoding (no-op for other formats)
+    image.draft("RGB", size)
+
+    # Convert to RGB if needed
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGB")
+
+    # Skip resampling when the image already (almost) fits the target size
+    if image.size == size:
+        logger.info("Image already fits the display, skipping resize")
+        image.load()  # Decode now so the cached image is ready to display
+    elif size[0] < image.width:
+        # Shrink to the display size, pre-reducing large images cheaply before the Lanczos pass
+        image = image.resize(size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+    else:
+        # Enlarge small images to fill the maximum dimensions (bilinear is enough when upsampling)
+        image = image.resize(size, Image.Resampling.BILINEAR)
+
+    return image
+
 
 class SurgicalToolsGUI:
     """A GUI application for detecting surgical tools in images and validating surgical tool sets."""
@@ -36,19 +152,38 @@ class SurgicalToolsGUI:
         self.root.columnconfigure(0, weight=1)
         self.root.columnconfigure(1, weight=0)
         self.current_image = None  # Store the current PhotoImage
+        self._image_window = None  # Window reused to display detection images
+        self._image_label = None
+        self._display_request = 0  # Incremented for every displayed image
+
+        # Reuse a keep-alive HTTP connection to the API across detections
+        self.http = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=4,
+            max_retries=Retry(total=2, backoff_factor=0.1),
+        )
+        self.http.mount("http://", adapter)
 
-        # Load config to get set types
-        try:
-            config_path = Path(__file__).parent.parent / "config.json"
-            with open(config_path) as f:
-                config = json.load(f)
-                self.reference_data = config["REFERENCE_DATA"]
-        except Exception as e:
-            messagebox.showerror("Error", f"Could not load config.json: {str(e)}")
-            self.reference_data = {}
+        # Worker threads for HTTP requests so the Tk main loop never blocks
+        self._pool = ThreadPoolExecutor(max_workers=2)
+
+        # Use the reference data loaded from config.json to get set types
+        self.reference_data = REFERENCE_DATA
+        if CONFIG_ERROR is not None:
+            messagebox.showerror("Error", f"Could not load config.json: {str(CONFIG_ERROR)}")
 
         self.create_widgets()
 
+        # Load Pillow once the window has been drawn so it does not delay the first paint
+        self.root.after_idle(self._preload_image_modules)
+
+    @staticmethod
+    def _preload_image_modules() -> None:
+        """Import Pillow while the GUI is idle so the first detection does not pay for it."""
+        import PIL.Image  # noqa: PLC0415 - imported lazily to speed up GUI startup
+        import PIL.ImageTk  # noqa: F401, PLC0415 - imported lazily to speed up GUI startup
+
     def create_widgets(self) -> None:
         """Create and configure all GUI widgets and layout for the application."""
         # Create main frame
@@ -86,8 +221,8 @@ class SurgicalToolsGUI:
             row=3, column=2, sticky=tk.W, pady=5)
 
         # Submit Button - Now at row 4
-        ttk.Button(main_frame, text="Detect Tools", command=self.submit).grid(
-            row=4, column=0, columnspan=3, pady=10)
+        self.submit_button = ttk.Button(main_frame, text="Detect Tools", command=self.submit)
+        self.submit_button.grid(row=4, column=0, columnspan=3, pady=10)
 
         # Configure text tags for colors - Now at row 5
         self.results_text = tk.Text(main_frame, height=10, width=50, wrap=tk.WORD)
@@ -104,11 +239,10 @@ class SurgicalToolsGUI:
         # Set Type Selection
         ttk.Label(main_frame, text="Set Type:").grid(
             row=0, column=0, sticky=tk.W, pady=5)
-        self.set_type = ttk.Combobox(
-            main_frame, values=list(self.reference_data.keys()))
+        self.set_type = ttk.Combobox(main_frame, values=SET_TYPES)
         self.set_type.grid(row=0, column=1, sticky=(tk.W, tk.E), pady=5)
-        if self.reference_data:
-            self.set_type.set(next(iter(self.reference_data.keys())))
+        if SET_TYPES:
+            self.set_type.set(SET_TYPES[0])
 
         # Actual Weight
         ttk.Label(main_frame, text="Weight:").grid(
@@ -135,38 +269,30 @@ class SurgicalToolsGUI:
         if filename:
             self.image_path.set(filename)
 
-    def display_image(self, image_path: str | Path) -> None:
+    def display_image(self, image_data: bytes) -> None:
         """
-        Display an image in a new window with appropriate scaling.
+        Display an image in the detection results window with appropriate scaling.
 
         Args:
-            image_path: Path to the image file as string or Path object.
+            image_data: Encoded image bytes as returned by the server.
 
 
         """
         try:
-            logger.info(f"Loading image from: {image_path}")
-
-            # Verify image path
-            image_path = str(image_path)  # Convert Path to string if needed
-            if not Path(image_path).exists():
-                raise ValueError(f"Image file does not exist: {image_path}")
-
-            # Create a new Toplevel window for the image
-            image_window = tk.Toplevel(self.root)
-            image_window.title("Detection Results")
-
-            # Create a label to display the image
-            image_label = ttk.Label(image_window)
-            image_label.pack(expand=True, fill=tk.BOTH, padx=10, pady=10)
-
-            # Open and process image
-            image = Image.open(image_path)
-            logger.info(f"Original image size: {image.size}")
-
-            # Convert to RGB if needed
-            if image.mode not in ("RGB", "RGBA"):
-                image = image.convert("RGB")
+            logger.info(f"Loading image of {len(image_data)} bytes")
+
+            # Reuse the image window across detections, creating it on first use
+            if self._image_window is None:
+                self._image_window = tk.Toplevel(self.root)
+                self._image_window.title("Detection Results")
+                # Hide instead of destroying the window when it is closed
+                self._image_window.protocol("WM_DELETE_WINDOW", self._image_window.withdraw)
+
+                # Create a label to display the image
+                self._image_label = ttk.Label(self._image_window)
+                self._image_label.pack(expand=True, fill=tk.BOTH, padx=10, pady=10)
+            else:
+                self._image_window.deiconify()
 
             # Get screen dimensions
             screen_width = self.root.winfo_screenwidth()
@@ -176,50 +302,72 @@ class SurgicalToolsGUI:
             max_width = int(screen_width * 0.8)
             max_height = int(screen_height * 0.8)
 
-            # Get original dimensions
-            img_width, img_height = image.size
-
-            # Calculate scaling ratio
-            width_ratio = max_width / img_width
-            height_ratio = max_height / img_height
-            ratio = min(width_ratio, height_ratio)
-
-            # Calculate new dimensions
-            new_width = int(img_width * ratio)
-            new_height = int(img_height * ratio)
-            logger.info(f"Resizing to: {new_width}x{new_height}")
+            # Only the most recent request may update the window
+            self._display_request += 1
+            request_id = self._display_request
 
-            # Resize image
-            image = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
+            # Show a fast low-resolution preview while the full-quality image is prepared
+            preview = prepare_preview_image(image_data, max_width, max_height)
+            if preview is not None:
+                self._show_image(preview)
 
-            # Save to temporary PNG file (PNG works better with Tkinter)
-            temp_path = Path(image_path).parent / "temp_display.png"
-            image.save(temp_path, format="PNG")
+            # Load and scale the image on a worker thread, reusing the cached result for identical images
+            future = self._pool.submit(prepare_display_image, image_data, max_width, max_height)
+            future.add_done_callback(lambda f: self.root.after(0, self._on_display_image_ready, f, request_id))
 
-            # Create PhotoImage directly from file
-            self.current_image = tk.PhotoImage(file=str(temp_path))
-            logger.info("Created PhotoImage")
-
-            # Display image in label
-            image_label.configure(image=self.current_image)
+        except Exception as e:
+            logger.error("Error displaying image:")
+            logger.error(traceback.format_exc())
+            messagebox.showerror("Error", f"Failed to display image: {str(e)}")
 
-            # Set window size and position
-            window_width = new_width + 20  # Add padding
-            window_height = new_height + 20
-            x = (screen_width - window_width) // 2
-            y = (screen_height - window_height) // 2
-            image_window.geometry(f"{window_width}x{window_height}+{x}+{y}")
+    def _on_display_image_ready(self, future: Future, request_id: int) -> None:
+        """
+        Replace the preview with the full-quality image once it has been prepared.
 
-            logger.info("Image displayed in new window")
+        Args:
+            future: The completed future holding the scaled image or exception
+            request_id: Display request the image belongs to
 
-            # Clean up temporary file
-            temp_path.unlink()
+        """
+        if request_id != self._display_request:
+            return
 
+        try:
+            self._show_image(future.result())
+            logger.info("Image displayed in results window")
         except Exception as e:
             logger.error("Error displaying image:")
             logger.error(traceback.format_exc())
             messagebox.showerror("Error", f"Failed to display image: {str(e)}")
 
+    def _show_image(self, image: Image.Image) -> None:
+        """
+        Show an already scaled image in the detection results window.
+
+        Args:
+            image: The scaled image to display
+
+        """
+        from PIL import ImageTk  # noqa: PLC0415 - imported lazily to speed up GUI startup
+
+        new_width, new_height = image.size
+        logger.info(f"Displaying at: {new_width}x{new_height}")
+
+        # Create PhotoImage directly from the in-memory image
+        self.current_image = ImageTk.PhotoImage(image)
+
+        # Display image in label
+        self._image_label.configure(image=self.current_image)
+
+        # Set window size and position
+        screen_width = self.root.winfo_screenwidth()
+        screen_height = self.root.winfo_screenheight()
+        window_width = new_width + 20  # Add padding
+        window_height = new_height + 20
+        x = (screen_width - window_width) // 2
+        y = (screen_height - window_height) // 2
+        self._image_window.geometry(f"{window_width}x{window_height}+{x}+{y}")
+
     def update_status_displays(self, result: dict) -> tuple[list, list]:
         """
         Update the status displays with detection results.
@@ -271,46 +419,45 @@ class SurgicalToolsGUI:
 
         """
         self.results_text.delete(1.0, tk.END)
-        self.results_text.insert(tk.END, "Detection Results:\n\n")
+
+        # Build the plain results section and insert it with a single call
+        body_lines = ["Detection Results:\n\n"]
 
         # Display operation type if available
         if "operation_type" in result:
-            self.results_text.insert(tk.END, f"Operation Type: {result['operation_type']}\n\n")
+            body_lines.append(f"Operation Type: {result['operation_type']}\n\n")
 
         # Display detected instruments
-        self.results_text.insert(tk.END, "Detected Instruments:\n")
-        for instrument in result["detected_instruments"]:
-            self.results_text.insert(
-                tk.END,
-                f"- {instrument['type']}: {instrument['count']}\n",
-            )
+        body_lines.append("Detected Instruments:\n")
+        body_lines.extend(
+            f"- {instrument['type']}: {instrument['count']}\n" for instrument in result["detected_instruments"]
+        )
 
         # Display set completion status
-        self.results_text.insert(
-            tk.END,
-            f"\nSet Complete: {result['set_complete']}\n",
-        )
+        body_lines.append(f"\nSet Complete: {result['set_complete']}\n")
+        self.results_text.insert(tk.END, "".join(body_lines))
+
+        # Build the highlighted mismatch section and insert it with a single call
+        mismatch_lines = []
 
         # Display tool mismatches if any
         if tool_mismatches:
-            self.results_text.insert(tk.END, "\nMissing Tools ", "red")
-            self.results_text.insert(tk.END, f"(Total: {len(tool_mismatches)}):\n", "red")
-            for item in tool_mismatches:
-                self.results_text.insert(
-                    tk.END,
-                    f"- {item['type']}: Found {item['found']}, Expected {item['expected']}\n",
-                    "red",
-                )
+            mismatch_lines.append(f"\nMissing Tools (Total: {len(tool_mismatches)}):\n")
+            mismatch_lines.extend(
+                f"- {item['type']}: Found {item['found']}, Expected {item['expected']}\n"
+                for item in tool_mismatches
+            )
 
         # Display weight mismatch if any
         if weight_mismatch:
-            self.results_text.insert(tk.END, "\nWeight Mismatch:\n", "red")
-            self.results_text.insert(
-                tk.END,
+            mismatch_lines.append(
+                "\nWeight Mismatch:\n"
                 f"- Found: {weight_mismatch['found']}kg, Expected: {weight_mismatch['expected']}kg\n",
-                "red",
             )
 
+        if mismatch_lines:
+            self.results_text.insert(tk.END, "".join(mismatch_lines), "red")
+
     def submit(self) -> None:
         """Handle the submission of the form, validate inputs, and send the detection request to the server."""
         if not self.image_path.get():
@@ -323,41 +470,68 @@ class SurgicalToolsGUI:
             messagebox.showerror("Error", "Please enter a valid weight")
             return
 
-        # Prepare the files and data for the request
-        files = {
-            "image": ("image.jpg", open(self.image_path.get(), "rb"), "image/jpeg"),
-        }
+        # Prepare the data for the request
         data = {
             "set_type": self.set_type.get(),
             "weight_input": weight,
             "operation_type": self.operation_type_var.get(),
         }
 
-        try:
-            # Make the request
-            response = requests.post(
+        # Send the request on a worker thread and handle the response on the Tk thread
+        self.submit_button.state(["disabled"])
+        future = self._pool.submit(self._post_detection, self.image_path.get(), data)
+        future.add_done_callback(lambda f: self.root.after(0, self._on_response, f))
+
+    def _post_detection(self, image_path: str, data: dict) -> dict:
+        """
+        Send the detection request to the server.
+
+        Runs on a worker thread and must not touch any Tk widgets.
+
+        Args:
+            image_path: Path to the image to upload
+            data: Form fields sent along with the image
+
+        Returns:
+            The decoded detection result from the server
+
+        """
+        # Make the request, closing the image file once it has been sent
+        with open(image_path, "rb") as image_file:
+            files = {
+                "image": ("image.jpg", image_file, "image/jpeg"),
+            }
+            response = self.http.post(
                 "http://127.0.0.1:8000/infer", files=files, data=data, timeout=30)
-            response.raise_for_status()
+        response.raise_for_status()
 
+        result = orjson.loads(response.content)
+        logger.opt(lazy=True).debug(
+            "Received response from server: {}",
+            lambda: orjson.dumps(result, option=orjson.OPT_INDENT_2).decode(),
+        )
+        return result
+
+    def _on_response(self, future: Future) -> None:
+        """
+        Display the detection results once the request has completed.
+
+        Args:
+            future: The completed request future holding the result or exception
+
+        """
+        self.submit_button.state(["!disabled"])
+        try:
             # Display results
-            result = response.json()
-            logger.debug("Received response from server: {}", json.dumps(result, indent=2))
+            result = future.result()
 
             # Format and display the results
             self.display_results_text(result, *self.update_status_displays(result))
 
-            # Display the detected image and switch to the image tab
-            if "predicted_image_path" in result:
-                predicted_image_path = result["predicted_image_path"]
+            # Display the detected image sent inline by the server
+            if "predicted_image_b64" in result:
                 try:
-                    logger.info(f"Attempting to display image from: {predicted_image_path}")
-                    if Path(predicted_image_path).is_file():
-                        self.display_image(predicted_image_path)
-                    else:
-                        messagebox.showerror(
-                            "Error",
-                            f"Predicted image not found at: {predicted_image_path}",
-                        )
+                    self.display_image(base64.b64decode(result["predicted_image_b64"]))
                 except Exception as e:
                     messagebox.showerror("Error", f"Error displaying image: {str(e)}")
             else:
@@ -1,20 +1,37 @@
 from __future__ import annotations
 
-import json
+import os
+import mmap
+import hashlib
+import weakref
+import threading
 from typing import TYPE_CHECKING
 from pathlib import Path
+from functools import lru_cache
+from contextlib import contextmanager
+from collections import Counter
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 import cv2
+import numpy as np
+import torch
+import orjson
 from loguru import logger
+from ultralytics import YOLO
+from ultralytics.data.utils import IMG_FORMATS
+from ultralytics.engine.results import Results
 
 if TYPE_CHECKING:
-    from ultralytics import YOLO
+    from collections.abc import Iterator
 
 
 def load_config(config_path: str | Path) -> dict:
     """
     Load configuration from a JSON file.
 
+    Parsed configs are cached until the file is modified, so the returned dictionary is shared and must not be mutated.
+
     Args:
         config_path (str or Path): Path to the config file
 
@@ -22,43 +39,413 @@ def load_config(config_path: str | Path) -> dict:
         dict: Configuration dictionary
 
     """
-    with open(config_path) as f:
-        return json.load(f)
+    path = Path(config_path)
+    return _load_config_cached(str(path), path.stat().st_mtime_ns)
+
+@lru_cache(maxsize=8)
+def _load_config_cached(config_path: str, mtime_ns: int) -> dict:  # noqa: ARG001 - only part of the cache key
+    """Parse a config file; the modification time is only part of the cache key."""
+    return orjson.loads(Path(config_path).read_bytes())
+
+@contextmanager
+def map_file(path: str | Path) -> Iterator[mmap.mmap | bytes]:
+    """
+    Memory-map a file read-only so its bytes come straight from the OS page cache.
+
+    Args:
+        path (str or Path): Path to the file
+
+    Yields:
+        mmap or bytes: Read-only view of the file contents (empty bytes for an empty file)
+
+    """
+    with open(path, "rb") as f:
+        # mmap cannot map an empty file
+        if Path(path).stat().st_size == 0:
+            yield b""
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield mm
+
+# Upper bound on the size of the JSON metadata header of an exported TensorRT engine
+ENGINE_METADATA_MAX_SIZE = 1 << 20
+
+def decode_image(data: bytes | mmap.mmap) -> np.ndarray | None:
+    """
+    Decode an encoded image into a BGR array.
+
+    OpenCV applies the EXIF orientation while decoding, as the Ultralytics loader for image files does.
+
+    Args:
+        data (bytes or mmap): Encoded image bytes
+
+    Returns:
+        ndarray: Decoded BGR image, or None if the data could not be decoded
+
+    """
+    return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+
+def read_engine_metadata(engine_path: Path) -> dict | None:
+    """
+    Read the metadata Ultralytics stores in front of an exported TensorRT engine.
+
+    Args:
+        engine_path (Path): Path to the .engine file
+
+    Returns:
+        dict: Export metadata, or None if the file has none
+
+    """
+    with open(engine_path, "rb") as f:
+        size = int.from_bytes(f.read(4), byteorder="little", signed=True)
+        if not 0 < size <= ENGINE_METADATA_MAX_SIZE:
+            return None
+        try:
+            metadata = orjson.loads(f.read(size))
+        except orjson.JSONDecodeError:
+            return None
+    return metadata if isinstance(metadata, dict) else None
+
+def engine_is_usable(engine_path: Path, weights_path: Path, batch: int) -> bool:
+    """
+    Check that an engine is newer than its weights and accepts every batch size up to batch.
+
+    Args:
+        engine_path (Path): Path to the .engine file
+        weights_path (Path): Path to the weights the engine was exported from
+        batch (int): Largest batch size the engine must accept
+
+    Returns:
+        bool: Whether the engine can be used as is
+
+    """
+    if weights_path.exists() and engine_path.stat().st_mtime_ns < weights_path.stat().st_mtime_ns:
+        logger.warning("TensorRT engine {} is older than {}", engine_path, weights_path)
+        return False
+
+    metadata = read_engine_metadata(engine_path)
+    if metadata is None:
+        logger.warning("TensorRT engine {} has no export metadata", engine_path)
+        return False
+
+    engine_batch = int(metadata.get("batch", 1))
+    dynamic = bool(metadata.get("args", {}).get("dynamic", False))
+    # A static engine only runs its exact batch size, so micro-batches of other sizes would fail
+    if (dynamic and engine_batch >= batch) or engine_batch == batch == 1:
+        return True
+
+    logger.warning(
+        "TensorRT engine {} does not accept batches of up to {} (batch={}, dynamic={})",
+        engine_path, batch, engine_batch, dynamic,
+    )
+    return False
+
+def get_runtime_model(
+    weights_path: str | Path,
+    device: int | str = 0,
+    batch: int = 8,
+    export: bool = False,
+) -> YOLO:
+    """
+    Load the fastest available runtime for a set of YOLO weights.
+
+    A TensorRT engine next to the weights is loaded when it is newer than the weights and accepts the batch size.
+    With export enabled on a CUDA machine, a missing or unusable engine is (re)built as an FP16 engine with dynamic
+    batch and image sizes; FP16 halves memory traffic and runs on the tensor cores. A failed export is recorded in
+    a marker file next to the weights and not retried until the marker is deleted or the weights change.
+    Otherwise the PyTorch weights are loaded as is.
+
+    Args:
+        weights_path (str or Path): Path to the .pt weights
+        device (int or str): CUDA device used to build the engine
+        batch (int): Largest batch size the engine must accept
+        export (bool): Whether to build a missing or unusable engine
+
+    Returns:
+        YOLO: Loaded detection model
+
+    """
+    weights = Path(weights_path)
+    engine = weights.with_suffix(".engine")
+    failed_marker = weights.with_suffix(".engine-export-failed")
+
+    usable = torch.cuda.is_available() and engine.exists() and engine_is_usable(engine, weights, batch)
+    previous_failure = (
+        failed_marker.exists() and weights.exists()
+        and failed_marker.stat().st_mtime_ns >= weights.stat().st_mtime_ns
+    )
+
+    if not usable and export and previous_failure:
+        logger.warning("Skipping TensorRT export, a previous attempt failed (see {})", failed_marker)
+    elif not usable and export and torch.cuda.is_available():
+        logger.info("Exporting {} to TensorRT, this may take several minutes", weights)
+        try:
+            engine = Path(YOLO(weights, task="detect").export(
+                format="engine",
+                half=True,
+                dynamic=True,
+                batch=batch,
+                device=device,
+            ))
+            usable = True
+        except Exception as e:
+            failed_marker.write_text(f"{type(e).__name__}: {e}\n")
+            logger.warning("TensorRT export failed, using PyTorch weights: {}", e)
+
+    model_path = engine if usable else weights
+    logger.info("Loading YOLO model from {}", model_path)
+    return YOLO(model_path, task="detect")
+
+# In-process cache of detections keyed by image content and confidence threshold, one cache per model.
+# Entries hold only the CPU box data and class names, not the images or device tensors of the results.
+PREDICTION_CACHE_SIZE = 16
+_prediction_caches: weakref.WeakKeyDictionary[YOLO, OrderedDict[tuple, tuple]] = weakref.WeakKeyDictionary()
+_prediction_cache_lock = threading.Lock()
+
+def prediction_cache_key(
+    source: str | Path | np.ndarray | bytes | bytearray | mmap.mmap,
+    conf_threshold: float,
+) -> tuple | None:
+    """
+    Build the prediction cache key for an image from a hash of its content.
+
+    Args:
+        source: Path to the input image, its encoded bytes (or a mapping of them) or a decoded BGR image
+        conf_threshold (float): Confidence threshold for detections
+
+    Returns:
+        tuple: Cache key, or None if the source cannot be hashed (e.g. a URL or missing file)
+
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    if isinstance(source, np.ndarray):
+        digest.update(f"{source.shape}{source.dtype}".encode())
+        digest.update(np.ascontiguousarray(source).data)
+    elif isinstance(source, (bytes, bytearray, mmap.mmap)):
+        digest.update(source)
+    elif isinstance(source, (str, Path)) and Path(source).is_file():
+        with map_file(source) as data:
+            digest.update(data)
+    else:
+        return None
+    return (digest.hexdigest(), conf_threshold)
+
+def get_cached_prediction(model: YOLO, key: tuple | None) -> tuple | None:
+    """Return the cached box data and class names for a key, or None on a miss."""
+    if key is None:
+        return None
+    with _prediction_cache_lock:
+        cache = _prediction_caches.get(model)
+        entry = cache.get(key) if cache is not None else None
+        if entry is not None:
+            cache.move_to_end(key)
+        return entry
+
+def cache_prediction(model: YOLO, key: tuple | None, result: Results) -> None:
+    """Store the boxes and class names of a result, evicting the least recently used entry when full."""
+    if key is None:
+        return
+    entry = (result.boxes.data.cpu().numpy(), result.names)
+    with _prediction_cache_lock:
+        cache = _prediction_caches.setdefault(model, OrderedDict())
+        cache[key] = entry
+        cache.move_to_end(key)
+        while len(cache) > PREDICTION_CACHE_SIZE:
+            cache.popitem(last=False)
+
+def restore_prediction(entry: tuple, image: np.ndarray, path: str | Path | None = None) -> Results:
+    """
+    Rebuild a prediction result from a cache entry around the image it was predicted on.
+
+    Args:
+        entry (tuple): Cached box data and class names
+        image (ndarray): Decoded BGR image
+        path (str or Path, optional): Source path reported on the result
+
+    Returns:
+        Results: Prediction result with the cached boxes
+
+    """
+    boxes, names = entry
+    return Results(orig_img=image, path=str(path or "image0.jpg"), names=names, boxes=torch.from_numpy(boxes))
+
+def save_prediction(model: YOLO, result: Results) -> None:
+    """
+    Save an annotated prediction and its labels to the predictor's output directory, named after the source.
+
+    Args:
+        model: YOLO model that made the prediction
+        result (Results): Prediction result
+
+    """
+    save_dir = Path(model.predictor.save_dir)
+    (save_dir / "labels").mkdir(parents=True, exist_ok=True)
+    name = Path(result.path)
+    result.save(filename=str(save_dir / name.name))
+    result.save_txt(save_dir / "labels" / f"{name.stem}.txt", save_conf=True)
+
+def is_image_file(source: str | Path | np.ndarray) -> bool:
+    """Return whether a source is a path to an existing image file."""
+    return (
+        isinstance(source, (str, Path))
+        and Path(source).suffix[1:].lower() in IMG_FORMATS
+        and Path(source).is_file()
+    )
+
+def prepare_source(
+    source: str | Path | np.ndarray,
+    conf_threshold: float,
+    use_cache: bool,
+) -> tuple[tuple | None, str | Path | np.ndarray]:
+    """
+    Compute the cache key of an input and decode it ahead of inference if it is an image file.
+
+    Image files are memory-mapped once, and the same mapping is used for hashing and decoding.
+
+    Args:
+        source: Path to the input image or a decoded BGR image
+        conf_threshold (float): Confidence threshold for detections
+        use_cache (bool): Whether to compute the prediction cache key
+
+    Returns:
+        tuple: Cache key (None if caching is disabled) and the model input
+
+    """
+    if not is_image_file(source):
+        key = prediction_cache_key(source, conf_threshold) if use_cache else None
+        return key, source
+
+    with map_file(source) as data:
+        key = prediction_cache_key(data, conf_threshold) if use_cache else None
+        image = decode_image(data)
+    if image is None:
+        raise ValueError(f"Could not decode image: {source}")
+    return key, image
+
 def predict_image(model: YOLO,
-                  image_path: str | Path,
+                  image_paths: str | Path | np.ndarray | list[str | Path | np.ndarray],
                   conf_threshold: float = 0.1,
                   save: bool = True,
-                  show: bool = True) -> YOLO:
+                  show: bool = True,
+                  batch: int = 16,
+                  stream: bool = False,
+                  use_cache: bool = False,
+                  prefetch: bool = False,
+                  num_workers: int = 4,
+                  cache_keys: list[tuple | None] | None = None) -> list | Iterator:
     """
-    Perform prediction on an image using a YOLO model.
+    Perform prediction on one or more images using a YOLO model.
+
+    Images are sent to the model in batches so preprocessing and inference overhead is shared across them.
+    Image files are decoded with OpenCV before inference, so EXIF orientation is applied and a cached result is
+    rebuilt around the same image a fresh prediction would see. Any other single source (a directory, glob, video,
+    URL or .txt list) is passed to Ultralytics as is and predicted without the cache.
+    With stream enabled, results are yielded one at a time so only the current batch is held in memory.
+    With use_cache enabled, images seen before are answered from an in-process cache keyed by their content;
+    cache hits skip the model entirely, so nothing is saved or shown for them, and their results are rebuilt from
+    the cached boxes around the input image.
+    With prefetch enabled, a thread pool reads and decodes the next batch while the model runs on the current one.
 
     Args:
         model: YOLO model for prediction
-        image_path (str): Path to the input image
+        image_paths (str, Path, ndarray or list): Input image path or decoded BGR image, or a list of them
         conf_threshold (float): Confidence threshold for detections
         save (bool): Whether to save the results
         show (bool): Whether to display the results
+        batch (int): Maximum number of images per forward pass
+        stream (bool): Whether to return a lazy generator instead of a list
+        use_cache (bool): Whether to reuse results for previously seen images
+        prefetch (bool): Whether to decode the next batch in the background during inference
+        num_workers (int): Number of threads used for prefetching
+        cache_keys (list, optional): Precomputed cache keys, one per image (e.g. from the encoded upload bytes)
 
     Returns:
-        results: YOLO prediction results
+        results: YOLO prediction results, one per input image
 
     """
-    results = model.predict(
-        source=image_path,
-        conf=conf_threshold,
-        save=save,
-        save_txt=True,
-        save_conf=True,
-        show=show,
-    )
-    return results
+    if isinstance(image_paths, (str, Path)) and not is_image_file(image_paths):
+        results = model.predict(
+            source=image_paths,
+            conf=conf_threshold,
+            save=save,
+            save_txt=save,
+            save_conf=save,
+            show=show,
+            batch=batch,
+            stream=True,
+        )
+        return results if stream else list(results)
+
+    sources = image_paths if isinstance(image_paths, list) else [image_paths]
+
+    chunks = [sources[start:start + batch] for start in range(0, len(sources), batch)]
+    if cache_keys is not None:
+        if len(cache_keys) != len(sources):
+            raise ValueError("cache_keys must have one key per image")
+        key_chunks = [cache_keys[start:start + batch] for start in range(0, len(sources), batch)]
+    # Keys are only hashed from the sources when they were not given
+    hash_sources = use_cache and cache_keys is None
+
+    def iter_results() -> Iterator:
+        pool = ThreadPoolExecutor(max_workers=num_workers) if prefetch else None
+        try:
+            pending = [pool.submit(prepare_source, src, conf_threshold, hash_sources)
+                       for src in chunks[0]] if pool and chunks else []
+
+            for index, chunk in enumerate(chunks):
+                if pool:
+                    prepared = [future.result() for future in pending]
+                    # Start decoding the next batch while the model runs on this one
+                    if index + 1 < len(chunks):
+                        pending = [pool.submit(prepare_source, src, conf_threshold, hash_sources)
+                                   for src in chunks[index + 1]]
+                else:
+                    prepared = [prepare_source(src, conf_threshold, hash_sources) for src in chunk]
+
+                if cache_keys is not None:
+                    prepared = [(key, image) for key, (_, image) in zip(key_chunks[index], prepared, strict=True)]
+                yield from predict_chunk(chunk, prepared)
+        finally:
+            if pool:
+                pool.shutdown(cancel_futures=True)
+
+    def predict_chunk(chunk: list, prepared: list) -> Iterator:
+        cached = [get_cached_prediction(model, key) if use_cache else None for key, _ in prepared]
+
+        # Only run the model on images that are not cached
+        misses = [image for (_, image), hit in zip(prepared, cached, strict=True) if hit is None]
+        # Files reach the model as decoded arrays, so their predictions are saved here under the file names
+        fresh = iter(model.predict(
+            source=misses,
+            conf=conf_threshold,
+            show=show,
+            batch=len(misses),
+            stream=True,
+        ) if misses else ())
+
+        for src, (key, image), hit in zip(chunk, prepared, cached, strict=True):
+            path = src if isinstance(src, (str, Path)) else None
+            if hit is not None:
+                yield restore_prediction(hit, image, path)
+                continue
+            result = next(fresh)
+            if path is not None:
+                result.path = str(path)
+            if save:
+                save_prediction(model, result)
+            if use_cache:
+                cache_prediction(model, key, result)
+            yield result
+
+    results = iter_results()
+    return results if stream else list(results)
 
 def display_detections(results: list, model: YOLO) -> None:
     """
     Display detected objects with their class names and confidence scores.
 
     Args:
-        results: YOLO detection results
+        results: YOLO detection results, a list or a stream of them
         model: YOLO model with class names mapping
 
     """
@@ -67,19 +454,20 @@ def display_detections(results: list, model: YOLO) -> None:
         names = model.names
 
         for r in results:
-            logger.info(f"\nDetections in {Path(r.path).name}:")
-
             if not hasattr(r, "boxes") or len(r.boxes) == 0:
-                logger.info("No detections found.")
+                logger.info("\nDetections in {}:\nNo detections found.", Path(r.path).name)
                 continue
 
-            for box in r.boxes:
-                # Get the class index and convert to class name
-                class_id = int(box.cls[0])
-                class_name = names.get(class_id, "Unknown")
-                confidence = float(box.conf[0])
+            # Fetch class indices and confidences for all boxes at once
+            class_ids = r.boxes.cls.cpu().numpy().astype(np.int32).tolist()
+            confidences = r.boxes.conf.cpu().numpy().tolist()
 
-                logger.info(f"- {class_name} (Confidence: {confidence:.2f})")
+            # Build all detection lines at once and emit a single log record per image
+            lines = "\n".join(
+                f"- {names.get(class_id, 'Unknown')} (Confidence: {confidence:.2f})"
+                for class_id, confidence in zip(class_ids, confidences, strict=True)
+            )
+            logger.info("\nDetections in {}:\n{}", Path(r.path).name, lines)
 
     except Exception as e:
         logger.error(f"Error processing detections: {str(e)}")
@@ -89,7 +477,7 @@ def display_surgical_detections(results: list, surgical_instruments: dict) -> di
     Display detected surgical instruments with their proper names, counts, and confidence scores.
 
     Args:
-        results: YOLO detection results
+        results: YOLO detection results, a list or a stream of them
         surgical_instruments (dict): Mapping of class indices to instrument names
 
     Returns:
@@ -99,49 +487,103 @@ def display_surgical_detections(results: list, surgical_instruments: dict) -> di
     output = {"detected_instruments": []}
 
     try:
-        for r in results:
-            if not hasattr(r, 'boxes') or len(r.boxes) == 0:  # noqa: Q000
-                return {"detected_instruments": []}
+        # Gather class indices from all results and count them in a single pass
+        class_arrays = [r.boxes.cls.cpu().numpy().astype(np.int32)
+                        for r in results if hasattr(r, "boxes") and len(r.boxes) > 0]
+        if not class_arrays:
+            return output
+        class_ids, counts = np.unique(np.concatenate(class_arrays), return_counts=True)
+
+        # Sort by count (highest first), keeping class order for ties
+        order = np.argsort(-counts, kind="stable")
+        names = [
+            surgical_instruments.get(str(class_id)) or f"Unknown Instrument (Class {class_id})"
+            for class_id in class_ids[order].tolist()
+        ]
+
+        # Convert to required format
+        for instrument_name, count in zip(names, counts[order].tolist(), strict=True):
+            output["detected_instruments"].append({
+                "type": instrument_name,
+                "count": count,
+            })
 
-            # Dictionary to store counts of each instrument
-            instrument_counts = {}
+    except Exception as e:
+        return {"detected_instruments": [], "error": str(e)}
 
-            # Process all detections
-            for box in r.boxes:
-                class_id = int(box.cls[0])
-                confidence = float(box.conf[0])
-                instrument_name = surgical_instruments.get(str(class_id), f"Unknown Instrument (Class {class_id})")
+    else:
+        return output
 
-                # Update counts
-                if instrument_name in instrument_counts:
-                    instrument_counts[instrument_name]["count"] += 1
-                else:
-                    instrument_counts[instrument_name] = {
-                        "count": 1,
-                        "confidence": confidence,
-                    }
+# Drawing style for detection boxes and labels
+BOX_COLOR = (0, 255, 0)
+BOX_THICKNESS = 2
+LABEL_FONT = cv2.FONT_HERSHEY_SIMPLEX
+LABEL_SCALE = 0.5
 
-            # Convert to required format
-            for instrument_name, data in instrument_counts.items():
-                output["detected_instruments"].append({
-                    "type": instrument_name,
-                    "count": data["count"],
-                })
+def annotate(
+    img: np.ndarray,
+    detections: YOLO.Results,
+    surgical_instruments: dict[str, str],
+    conf_threshold: float = 0.25,
+    inplace: bool = False,
+) -> np.ndarray:
+    """
+    Draw detections on an image as bounding boxes and labels.
 
-            # Sort by count (highest first)
-            output["detected_instruments"].sort(key=lambda x: x["count"], reverse=True)
+    Args:
+        img (ndarray): BGR image
+        detections: YOLO detection results
+        surgical_instruments (dict): Mapping of class indices to instrument names
+        conf_threshold (float): Confidence threshold for showing detections
+        inplace (bool): Whether to draw on the given image instead of a copy
 
-            return output
+    Returns:
+        ndarray: Annotated BGR image
 
-    except Exception as e:
-        return {"detected_instruments": [], "error": str(e)}
+    """
+    if not inplace:
+        img = img.copy()
+
+    # Fetch all boxes at once and keep those above the confidence threshold
+    boxes = detections.boxes
+    confidences = boxes.conf.cpu().numpy()
+    keep = confidences >= conf_threshold
+    class_ids = boxes.cls.cpu().numpy().astype(np.int32)[keep]
+    xyxy = boxes.xyxy.cpu().numpy().astype(np.int32)[keep]
+
+    # Draw all bounding boxes in one call as closed (B, 4, 2) polygons
+    corners = np.stack([xyxy[:, [0, 1]], xyxy[:, [2, 1]], xyxy[:, [2, 3]], xyxy[:, [0, 3]]], axis=1)
+    cv2.polylines(img, list(corners), isClosed=True, color=BOX_COLOR, thickness=BOX_THICKNESS)
+
+    # Resolve each detected class name once rather than once per box
+    class_ids = class_ids.tolist()
+    names = {
+        class_id: surgical_instruments.get(str(class_id)) or f"Unknown ({class_id})"
+        for class_id in set(class_ids)
+    }
+
+    for (x1, y1), class_id, confidence in zip(xyxy[:, :2].tolist(), class_ids,
+                                              confidences[keep].tolist(), strict=True):
+        # Add label
+        label = f"{names[class_id]} ({confidence:.2%})"
+        cv2.putText(img, label, (x1, y1 - 10), LABEL_FONT, LABEL_SCALE, BOX_COLOR, BOX_THICKNESS)
+
+    return img
+
+def show_image(img: np.ndarray, window_name: str = "Detections") -> None:
+    """Show an image in an OpenCV window and block until a key is pressed."""
+    cv2.imshow(window_name, img)
+    cv2.waitKey(0)
+    cv2.destroyAllWindows()
 
 def visualize_detections(
     image_path: str | Path,
     detections: YOLO.Results,
     surgical_instruments: dict[str, str],
     conf_threshold: float = 0.25,
-) -> None:
+    show: bool = False,
+    save_path: str | Path | None = None,
+) -> np.ndarray:
     """
     Visualize detections on the image with bounding boxes and labels.
 
@@ -150,26 +592,77 @@ def visualize_detections(
         detections: YOLO detection results
         surgical_instruments (dict): Mapping of class indices to instrument names
         conf_threshold (float): Confidence threshold for showing detections
+        show (bool): Whether to show the image in a window, blocking until a key is pressed
+        save_path (str or Path, optional): Where to write the annotated image
+
+    Returns:
+        ndarray: Annotated BGR image
 
     """
-    img = cv2.imread(str(image_path))
+    with map_file(image_path) as data:
+        img = decode_image(data)
+    if img is None:
+        raise ValueError(f"Could not decode image: {image_path}")
 
-    for box in detections.boxes:
-        confidence = float(box.conf[0])
-        if confidence < conf_threshold:
-            continue
+    img = annotate(img, detections, surgical_instruments, conf_threshold, inplace=True)
 
-        class_id = int(box.cls[0])
-        instrument_name = surgical_instruments.get(str(class_id), f"Unknown ({class_id})")
+    if save_path is not None and not cv2.imwrite(str(save_path), img):
+        raise OSError(f"Could not write image: {save_path}")
+    if show:
+        show_image(img)
 
-        # Draw bounding box
-        x1, y1, x2, y2 = map(int, box.xyxy[0])
-        cv2.rectangle(img, (x1, y1), (x2, y2), (0, 255, 0), 2)
+    return img
 
-        # Add label
-        label = f"{instrument_name} ({confidence:.2%})"
-        cv2.putText(img, label, (x1, y1-10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+def save_annotated_image(
+    image_path: str | Path,
+    detections: YOLO.Results,
+    surgical_instruments: dict[str, str],
+    output_path: Path,
+    conf_threshold: float,
+) -> Path:
+    """Annotate one image and write it to the output path."""
+    visualize_detections(image_path, detections, surgical_instruments, conf_threshold, save_path=output_path)
+    return output_path
+
+def visualize_many(
+    image_paths: list[str | Path],
+    detections_list: list,
+    surgical_instruments: dict[str, str],
+    output_dir: str | Path,
+    conf_threshold: float = 0.25,
+    max_workers: int | None = None,
+) -> list[Path]:
+    """
+    Annotate many images in parallel and save them to a directory.
 
-    cv2.imshow("Detections", img)
-    cv2.waitKey(0)
-    cv2.destroyAllWindows()
+    Decoding, drawing and encoding are OpenCV calls that release the GIL, so a thread pool scales them across cores.
+    Images are saved under their original file names, so the names must be unique across the inputs.
+
+    Args:
+        image_paths (list): Paths to the images
+        detections_list (list): YOLO detection results, one per image
+        surgical_instruments (dict): Mapping of class indices to instrument names
+        output_dir (str or Path): Directory the annotated images are written to
+        conf_threshold (float): Confidence threshold for showing detections
+        max_workers (int): Number of worker threads, defaults to the number of CPUs
+
+    Returns:
+        list: Paths of the saved images, in input order
+
+    """
+    output_dir = Path(output_dir)
+    output_paths = [output_dir / Path(path).name for path in image_paths]
+
+    # Refuse to let images from different folders overwrite each other
+    duplicates = sorted(name for name, count in Counter(path.name for path in output_paths).items() if count > 1)
+    if duplicates:
+        raise ValueError(f"Images share output file names: {', '.join(duplicates)}")
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as pool:
+        futures = [
+            pool.submit(save_annotated_image, path, detections, surgical_instruments, output_path, conf_threshold)
+            for path, detections, output_path in zip(image_paths, detections_list, output_paths, strict=True)
+        ]
+        return [future.result() for future in futures]